@@ -1,11 +1,12 @@
-#!/usr/bin/python
+#!/usr/bin/env python3
 
-import time
 import re
 import argparse
 import os
 import os.path
 
+import profiling
+
 REGEXP_TRANSLATIONS_PATTERN = r".*tr\s*\(\s*\"(.+)\"\s*\)"
 REGEXP_INCLUDE_PATTERN = r"""\s*#\s*include\s*[\<\"](.+)[\>\"]\s*"""
 REGEXP_CLASS_PATTERN = r"\s*class\s*([\w\d]+)\s*;\s*"
@@ -51,33 +52,32 @@ def find_duplicates(rootdir):
 
     all_duplicates = {}
 
-    for root, dirs, files in os.walk(rootdir):
-        for file in files:
-            if os.path.splitext(file)[1] in FILE_SUFFIX_TO_SCAN:
-                filename = os.path.abspath(os.path.join(root, file))
-                file_duplicates = scan_file(filename)
-                if len(file_duplicates) > 0:
-                    all_duplicates[filename] = file_duplicates
-
-    for filename, file_duplicates in all_duplicates.iteritems():
-        print("************** {0} ***************".format(filename))
-        for description, duplicates in file_duplicates.iteritems():
-            for duplicate, count in duplicates.iteritems():
-                print("{0} -> {1} -> {2}".format(description, duplicate, count))
+    with profiling.phase("scan"):
+        for root, dirs, files in os.walk(rootdir):
+            for file in files:
+                if os.path.splitext(file)[1] in FILE_SUFFIX_TO_SCAN:
+                    filename = os.path.abspath(os.path.join(root, file))
+                    file_duplicates = scan_file(filename)
+                    if len(file_duplicates) > 0:
+                        all_duplicates[filename] = file_duplicates
+
+    with profiling.phase("print"):
+        for filename, file_duplicates in all_duplicates.items():
+            print("************** {0} ***************".format(filename))
+            for description, duplicates in file_duplicates.items():
+                for duplicate, count in duplicates.items():
+                    print("{0} -> {1} -> {2}".format(description, duplicate, count))
 
 def main():
     parser = argparse.ArgumentParser(description="Find duplicates in translation file")
     parser.add_argument("-r", "--root", dest="root", required=False, default=ROOT_DIR, help="root dir to process")
 
+    profiling.add_arguments(parser)
     args = parser.parse_args()
 
     print("start...\n")
 
-    start_time = time.time()
-    find_duplicates(args.root)
-    end_time = time.time()
-
-    print("\nscript execution: {0} ms".format((end_time - start_time) * 1000))
+    profiling.run(args, find_duplicates, args.root)
     print("end...")
 
 if __name__ == "__main__":
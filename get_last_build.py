@@ -11,6 +11,8 @@ import shutil
 import re
 from html.parser import HTMLParser
 
+import profiling
+
 BUILD_DIRECTORY_URL = "http://buildsby.viberlab.com/builds/Viber/ViberPC/DevBuilds/"
 BUILD_VERSION_SPLITTER = "."
 BUILD_VERSION_SECTIONS = 4
@@ -356,7 +358,8 @@ class Processor:
         version_directory = urljoin(self.__conf.root_url, self.__conf.version)
 
         try:
-            build, revision = self.__last_build(version_directory)
+            with profiling.phase("find build"):
+                build, revision = self.__last_build(version_directory)
             if not build:
                 raise CustomError("Unable to find build")
         except Exception as err:
@@ -371,7 +374,8 @@ class Processor:
                 if not download_url:
                     raise CustomError("Download url is empty")
 
-                installer_path = self.__download_build(download_url)
+                with profiling.phase("download"):
+                    installer_path = self.__download_build(download_url)
                 if not installer_path:
                     raise CustomError("Error was occurred during download process")
             except Exception as err:
@@ -380,11 +384,21 @@ class Processor:
             if self.__conf.install:
                 try:
                     install_command = self.__make_install_command(installer_path)
-                    self.__install_build(installer_path, install_command)
+                    with profiling.phase("install"):
+                        self.__install_build(installer_path, install_command)
                 except Exception as err:
                     raise CustomError("Install build: {}".format(err))
 
 
+def process(args):
+    try:
+        p = Processor(Configuration(args))
+        p.process()
+        print("success")
+    except CustomError as err:
+        print("error: {}".format(err))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Get last build from remote repository")
     parser.add_argument("-v", "--version", dest="version", required=True, help="build version to process")
@@ -396,18 +410,12 @@ def main():
     parser.add_argument("-i", "--install", dest="install", action="store_true", default=False, help="trigger installation process")
     parser.add_argument("-b", "--backup", dest="backup", action="store_true", default=False, help="backup ViberPC folder")
     parser.add_argument("-f", "--fedora", dest="fedora", action="store_true", default=False, help="stub for fedora linux")
+    profiling.add_arguments(parser)
     args = parser.parse_args()
+    if args.repeat > 1 and (args.install or args.backup):
+        parser.error("--repeat can't be combined with --install or --backup")
 
-    start_time = time.time()
-    try:
-        p = Processor(Configuration(args))
-        p.process()
-        print("success")
-    except CustomError as err:
-        print("error: {}".format(err))
-    end_time = time.time()
-
-    print("script execution: {0} ms".format((end_time - start_time) * 1000))
+    profiling.run(args, process, args)
     print("end...")
 
 
@@ -1,46 +1,270 @@
-#!/usr/bin/python
+#!/usr/bin/env python3
 
-import sys
+import argparse
+import collections
+import multiprocessing
+import os
+import os.path
+import random
+import struct
 import time
 
+import profiling
+
 WRITE_CHUNK_SIZE = 1 * 1024 * 1024
 
+MODE_PATTERN = "pattern"
+MODE_RANDOM = "random"
+MODE_COUNTER = "counter"
+MODE_TEMPLATE = "template"
+MODES = (MODE_PATTERN, MODE_RANDOM, MODE_COUNTER, MODE_TEMPLATE)
 
-def generate_file(filename, size, data):
-    data_size = len(data.decode("utf-8"))
-    write_chunk = int(WRITE_CHUNK_SIZE / data_size) * data
-    real_write_chunk_size = len(write_chunk)
-    chunks_to_write = int(size / real_write_chunk_size)
-    last_chunk_size = size - chunks_to_write * real_write_chunk_size
+DEFAULT_PATTERN = "0"
+DEFAULT_TEMPLATE = "file {file:04d} block {block:08d} line {line:08d}: {word} {word2} {word3}\n"
+DEFAULT_SEED = 0
+TEMPLATE_WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+                  "india", "juliett", "kilo", "lima", "mike", "november", "oscar", "papa")
+TEMPLATE_VARIANTS = 256
+COUNTER_RECORD = struct.Struct(">QQ")
+FSYNC_PERCENTILES = (50, 95, 99)
 
-    with open(filename, "w") as file:
-        for _ in range(chunks_to_write):
-            file.write(write_chunk)
-        file.write(write_chunk[:last_chunk_size])
+Job = collections.namedtuple("Job", "worker indexes filename files size mode data block_size seed fsync profiling")
+WorkerStats = collections.namedtuple("WorkerStats", "worker files bytes elapsed generate_time write_time fsync_times profiling")
 
 
-def main():
-    print("start...")
+def make_filename(filename, index, files):
+    if files <= 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return "{0}_{1:04d}{2}".format(root, index, ext)
 
-    if len(sys.argv) < 3:
-        print("parameter mismatch: {0} {1} {2} {3}".format(__file__, "<filename>", "<size in mb>", "<data>"))
-        return
 
-    try:
-        filename = sys.argv[1]
-        size = int(sys.argv[2]) * 1024 * 1024
-        data = sys.argv[3]
-    except IndexError:
-        data = "0"
-    except ValueError as value_err:
-        print(value_err)
+def make_rng(seed, index):
+    # seeded from a string so every file is reproducible regardless of the worker that writes it
+    return random.Random("{0}:{1}".format(seed, index))
+
+
+def pattern_blocks(data, block_size, rng, index):
+    pattern = data.encode("utf-8")
+    block = (pattern * (block_size // len(pattern) + 1))[:block_size]
+    while True:
+        yield block
+
+
+def random_blocks(data, block_size, rng, index):
+    bits = block_size * 8
+    while True:
+        yield rng.getrandbits(bits).to_bytes(block_size, "little")
+
+
+def counter_blocks(data, block_size, rng, index):
+    repeat = block_size // COUNTER_RECORD.size + 1
+    block = 0
+    while True:
+        yield (COUNTER_RECORD.pack(index, block) * repeat)[:block_size]
+        block += 1
+
+
+def template_blocks(data, block_size, rng, index):
+    # words are picked once per file and cycled, only the counters change from line to line
+    variants = [(rng.choice(TEMPLATE_WORDS), rng.choice(TEMPLATE_WORDS), rng.choice(TEMPLATE_WORDS))
+                for _ in range(TEMPLATE_VARIANTS)]
+    buffer = bytearray()
+    offset = 0
+    line = 0
+    while True:
+        while len(buffer) < block_size:
+            batch_offset = offset
+            for word, word2, word3 in variants:
+                # block is the output block where the line starts, taken from its byte offset in the file
+                text = data.format(file=index, block=offset // block_size, line=line,
+                                   word=word, word2=word2, word3=word3).encode("utf-8")
+                buffer += text
+                offset += len(text)
+                line += 1
+            if offset == batch_offset:
+                raise ValueError("template renders to empty text")
+        yield bytes(buffer[:block_size])
+        del buffer[:block_size]
+
+
+BLOCK_GENERATORS = {
+    MODE_PATTERN: pattern_blocks,
+    MODE_RANDOM: random_blocks,
+    MODE_COUNTER: counter_blocks,
+    MODE_TEMPLATE: template_blocks,
+}
+
+
+def generate_file(filename, size, blocks, fsync=False):
+    written = 0
+    generate_time = 0.0
+    write_time = 0.0
+    fsync_time = None
+
+    with open(filename, "wb") as file:
+        while written < size:
+            start_time = time.perf_counter()
+            block = next(blocks)[:size - written]
+            write_start_time = time.perf_counter()
+            file.write(block)
+            end_time = time.perf_counter()
+
+            generate_time += write_start_time - start_time
+            write_time += end_time - write_start_time
+            written += len(block)
+
+        if fsync:
+            file.flush()
+            start_time = time.perf_counter()
+            os.fsync(file.fileno())
+            fsync_time = time.perf_counter() - start_time
+
+    return written, generate_time, write_time, fsync_time
+
+
+def run_worker(job):
+    total_bytes = 0
+    generate_time = 0.0
+    write_time = 0.0
+    fsync_times = []
+
+    with profiling.WorkerSession("worker {0}".format(job.worker), job.profiling) as session:
+        start_time = time.perf_counter()
+        for index in job.indexes:
+            blocks = BLOCK_GENERATORS[job.mode](job.data, job.block_size, make_rng(job.seed, index), index)
+            written, file_generate_time, file_write_time, fsync_time = generate_file(
+                make_filename(job.filename, index, job.files), job.size, blocks, job.fsync)
+            total_bytes += written
+            generate_time += file_generate_time
+            write_time += file_write_time
+            if fsync_time is not None:
+                fsync_times.append(fsync_time)
+        end_time = time.perf_counter()
+
+    return WorkerStats(job.worker, len(job.indexes), total_bytes, end_time - start_time,
+                       generate_time, write_time, fsync_times, session.report())
+
+
+def make_jobs(filename, files, workers, size, mode, data, block_size, seed, fsync):
+    # a single job runs in this process and is already covered by the parent profiler
+    options = profiling.worker_options() if workers > 1 else None
+    jobs = []
+    for worker in range(workers):
+        indexes = list(range(worker, files, workers))
+        if indexes:
+            jobs.append(Job(worker, indexes, filename, files, size, mode, data, block_size, seed, fsync, options))
+    return jobs
+
+
+def throughput(size, elapsed):
+    if elapsed <= 0:
+        return 0.0
+    return size / elapsed / (1024 * 1024)
+
+
+def print_report(stats, elapsed):
+    # worker throughput covers write and fsync calls but not content generation,
+    # the total is wall clock throughput of the whole run including generation
+    for worker_stats in sorted(stats, key=lambda s: s.worker):
+        fsync_time = sum(worker_stats.fsync_times)
+        print("worker {0}: files {1}, {2} bytes, {3:.2f} ms, generate {4:.2f} ms, write {5:.2f} ms, fsync {6:.2f} ms, "
+              "write+fsync {7:.2f} MB/s".format(
+                  worker_stats.worker,
+                  worker_stats.files,
+                  worker_stats.bytes,
+                  worker_stats.elapsed * 1000,
+                  worker_stats.generate_time * 1000,
+                  worker_stats.write_time * 1000,
+                  fsync_time * 1000,
+                  throughput(worker_stats.bytes, worker_stats.write_time + fsync_time)))
+
+    total_files = sum(s.files for s in stats)
+    total_bytes = sum(s.bytes for s in stats)
+    print("total: files {0}, {1} bytes, {2:.2f} ms, wall {3:.2f} MB/s".format(
+        total_files, total_bytes, elapsed * 1000, throughput(total_bytes, elapsed)))
+
+    fsync_times = [t for s in stats for t in s.fsync_times]
+    if fsync_times:
+        print("fsync: {0}, max {1:.3f} ms".format(
+            ", ".join("p{0} {1:.3f} ms".format(p, profiling.percentile(fsync_times, p) * 1000) for p in FSYNC_PERCENTILES),
+            max(fsync_times) * 1000))
+
+
+def generate_files(filename, files, workers, size, mode, data, block_size, seed, fsync):
+    jobs = make_jobs(filename, files, workers, size, mode, data, block_size, seed, fsync)
+
+    start_time = time.perf_counter()
+    with profiling.phase("write"):
+        if len(jobs) <= 1:
+            stats = [run_worker(job) for job in jobs]
+        else:
+            with profiling.suspended():
+                with multiprocessing.Pool(len(jobs), initializer=profiling.init_worker) as pool:
+                    stats = pool.map(run_worker, jobs)
+    end_time = time.perf_counter()
+
+    for worker_stats in stats:
+        profiling.collect(worker_stats.profiling)
+
+    return stats, end_time - start_time
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("{0} is not a positive number".format(value))
+    return number
+
+
+def non_negative_float(value):
+    number = float(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("{0} is a negative number".format(value))
+    return number
+
+
+def generate_and_report(args, data):
+    stats, elapsed = generate_files(args.filename, args.files, min(args.workers, args.files),
+                                    int(args.size * 1024 * 1024), args.mode, data,
+                                    args.block_size, args.seed, args.fsync)
+    print_report(stats, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate files filled with test data")
+    parser.add_argument("filename", help="output file name, index is appended when several files are generated")
+    parser.add_argument("size", type=non_negative_float, help="size of every file in mb")
+    parser.add_argument("data", nargs="?", default=None, help="pattern for pattern mode or format string for template mode")
+    parser.add_argument("-n", "--files", dest="files", type=positive_int, default=1, help="number of files to generate")
+    parser.add_argument("-w", "--workers", dest="workers", type=positive_int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("-m", "--mode", dest="mode", choices=MODES, default=MODE_PATTERN, help="content mode")
+    parser.add_argument("-b", "--block-size", dest="block_size", type=positive_int, default=WRITE_CHUNK_SIZE, help="write block size in bytes")
+    parser.add_argument("-s", "--seed", dest="seed", type=int, default=DEFAULT_SEED, help="seed for random and template modes, "
+                        "file content is reproducible for the same seed, mode, block size and data")
+    parser.add_argument("-f", "--fsync", dest="fsync", action="store_true", default=False, help="fsync every file after write")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    data = args.data
+    if data is None:
+        data = DEFAULT_TEMPLATE if args.mode == MODE_TEMPLATE else DEFAULT_PATTERN
+    if not data:
+        print("data should not be empty")
         return
+    if args.mode == MODE_TEMPLATE:
+        try:
+            sample = data.format(file=0, block=0, line=0, word=TEMPLATE_WORDS[0], word2=TEMPLATE_WORDS[0], word3=TEMPLATE_WORDS[0])
+        except (KeyError, IndexError, ValueError, TypeError, AttributeError) as format_err:
+            print("invalid template: {0}".format(format_err))
+            return
+        if not sample:
+            print("invalid template: renders to empty text")
+            return
 
-    start_time = time.time()
-    generate_file(filename, size, data)
-    end_time = time.time()
+    print("start...")
 
-    print("script execution: {0} ms".format((end_time - start_time) * 1000))
+    profiling.run(args, generate_and_report, args, data)
     print("end...")
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+import argparse
+import cProfile
+import collections
+import contextlib
+import itertools
+import math
+import os
+import pstats
+import statistics
+import sys
+import time
+import tracemalloc
+
+PHASE_TOTAL = "script execution"
+DEFAULT_REPEAT = 1
+REPORT_PERCENTILE = 95
+
+WorkerOptions = collections.namedtuple("WorkerOptions", "profile trace_malloc")
+WorkerReport = collections.namedtuple("WorkerReport", "name profile peak_memory")
+
+_active_timer = None
+_active_profiler = None
+_active_options = None
+_worker_reports = []
+_session_ids = itertools.count()
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("{0} is not a positive number".format(value))
+    return number
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", dest="profile", required=False, default=None, metavar="FILE", help="write cProfile stats to file")
+    group.add_argument("--trace-malloc", dest="trace_malloc", action="store_true", default=False, help="report peak memory usage via tracemalloc")
+    group.add_argument("--repeat", dest="repeat", type=_positive_int, default=DEFAULT_REPEAT, metavar="N", help="run N times and report min/median/p95 timings")
+    return parser
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.__phases = collections.OrderedDict()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__phases.setdefault(name, []).append(time.perf_counter() - start_time)
+
+    def phases(self):
+        return self.__phases
+
+
+@contextlib.contextmanager
+def phase(name):
+    if _active_timer is None:
+        yield
+        return
+    with _active_timer.phase(name):
+        yield
+
+
+def worker_options():
+    if _active_options is None or not (_active_options.profile or _active_options.trace_malloc):
+        return None
+    return _active_options
+
+
+def init_worker():
+    # forked workers inherit the parent tracing state, WorkerSession traces them on its own
+    sys.setprofile(None)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def suspended():
+    # keeps the parent profiler from being inherited by processes forked inside the block
+    if _active_profiler:
+        _active_profiler.disable()
+    try:
+        yield
+    finally:
+        if _active_profiler:
+            _active_profiler.enable()
+
+
+class WorkerSession:
+    def __init__(self, name, options):
+        self.__name = name
+        self.__options = options
+        self.__profiler = None
+        self.__profile_file = None
+        self.__peak_memory = None
+
+    def __enter__(self):
+        if self.__options is None:
+            return self
+        if self.__options.trace_malloc:
+            tracemalloc.start()
+        if self.__options.profile:
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.__profiler:
+            self.__profiler.disable()
+            # a pool process may run several jobs, so the session id keeps their dumps apart
+            self.__profile_file = "{0}.{1}.{2}".format(self.__options.profile, os.getpid(), next(_session_ids))
+            self.__profiler.dump_stats(self.__profile_file)
+        if self.__options is not None and self.__options.trace_malloc:
+            self.__peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return False
+
+    def report(self):
+        if self.__options is None:
+            return None
+        return WorkerReport(self.__name, self.__profile_file, self.__peak_memory)
+
+
+def collect(report):
+    if report is not None and _active_options is not None:
+        _worker_reports.append(report)
+
+
+def merge_profiles(profiler, path, reports):
+    stats = pstats.Stats(profiler)
+    for profile_file in (r.profile for r in reports if r.profile):
+        stats.add(profile_file)
+        os.remove(profile_file)
+    stats.dump_stats(path)
+
+
+def format_timings(name, timings):
+    if len(timings) == 1:
+        return "{0}: {1} ms".format(name, timings[0] * 1000)
+    return "{0}: min {1:.3f} ms, median {2:.3f} ms, p{3} {4:.3f} ms ({5} runs)".format(
+        name,
+        min(timings) * 1000,
+        statistics.median(timings) * 1000,
+        REPORT_PERCENTILE,
+        percentile(timings, REPORT_PERCENTILE) * 1000,
+        len(timings))
+
+
+def print_report(timer, peak_memory, reports):
+    phases = timer.phases()
+    for name, timings in phases.items():
+        if name != PHASE_TOTAL:
+            print(format_timings("phase {0}".format(name), timings))
+
+    if peak_memory is not None:
+        print("peak memory: {0:.3f} mb".format(peak_memory / (1024 * 1024)))
+        worker_peaks = collections.OrderedDict()
+        for report in reports:
+            if report.peak_memory is not None:
+                worker_peaks[report.name] = max(worker_peaks.get(report.name, 0), report.peak_memory)
+        for name, worker_peak in worker_peaks.items():
+            print("peak memory {0}: {1:.3f} mb".format(name, worker_peak / (1024 * 1024)))
+
+    print(format_timings(PHASE_TOTAL, phases.get(PHASE_TOTAL, [])))
+
+
+def run(args, function, *function_args):
+    global _active_timer, _active_profiler, _active_options
+
+    timer = PhaseTimer()
+    profiler = cProfile.Profile() if args.profile else None
+    peak_memory = None
+    result = None
+
+    if args.trace_malloc:
+        tracemalloc.start()
+
+    _active_timer = timer
+    _active_profiler = profiler
+    _active_options = WorkerOptions(args.profile, args.trace_malloc)
+    del _worker_reports[:]
+    try:
+        for _ in range(args.repeat):
+            if profiler:
+                profiler.enable()
+            try:
+                with timer.phase(PHASE_TOTAL):
+                    result = function(*function_args)
+            finally:
+                if profiler:
+                    profiler.disable()
+    finally:
+        _active_timer = None
+        _active_profiler = None
+        _active_options = None
+        if args.trace_malloc:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    print("")
+    if profiler:
+        merge_profiles(profiler, args.profile, _worker_reports)
+        print("profile: {0}".format(args.profile))
+    print_report(timer, peak_memory, _worker_reports)
+
+    return result
@@ -1,9 +1,11 @@
-#!/usr/bin/python
+#!/usr/bin/env python3
 
-import time
+import argparse
 import os.path
 import re
 
+import profiling
+
 DEBUG_START = "#ifdef _DEBUG"
 DEBUG_END = "#endif"
 QPROPERTY = "Q_PROPERTY"
@@ -102,16 +104,18 @@ def findQtProperties(lines):
 def processSourceFile(filename):
     startFileSize = os.path.getsize(filename)
 
-    with open(filename, "r") as file:
-        lines = file.readlines()
+    with profiling.phase("read"):
+        with open(filename, "r") as file:
+            lines = file.readlines()
 
     if len(lines) <= 0:
         print("file {0} is empty".format(filename))
         return
 
     #properties, debugProperties = findAndSortByPattern(lines, REGEXP_PROPERTY_PATTERN)
-    methods, debugMethods = findAndSortByPattern(lines, REGEXP_METHOD_PATTERN)
-    removeUselessLines(lines)
+    with profiling.phase("sort"):
+        methods, debugMethods = findAndSortByPattern(lines, REGEXP_METHOD_PATTERN)
+        removeUselessLines(lines)
     outputFileName = filename + "_output"
     #writeCppFile(outputFileName, lines, properties, debugProperties)
 
@@ -119,13 +123,13 @@ def processSourceFile(filename):
     print("start file size = {0}\nend file size = {1}".format(startFileSize, endFileSize))
 
 def main():
-    print("start...")
+    parser = argparse.ArgumentParser(description="Sort qt properties in translation file")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
 
-    start_time = time.time()
-    processSourceFile("Translations.h")
-    end_time = time.time()
+    print("start...")
 
-    print("script execution: {0} ms".format((end_time - start_time) * 1000))
+    profiling.run(args, processSourceFile, "Translations.h")
     print("end...")
 
 if __name__ == "__main__":